@@ -1,185 +1,570 @@
 import os
 import sys
 import argparse
+import asyncio
 import concurrent.futures
 import subprocess
 import shutil
-from pathlib import Path
+import threading
+import queue
+import time
+import atexit
+import errno
+import platform
+import json
+import re
+
+# MP3 pass-through is I/O bound, so a handful of copy threads is plenty.
+COPY_WORKERS = 4
+# FLACs encoded per ffmpeg invocation, amortizing process startup and codec init.
+BATCH_SIZE = 8
+# Where supported, scan directories through an open fd so every stat is resolved
+# relative to it (fstatat) instead of walking the full path again.
+SCANDIR_FD = os.scandir in os.supports_fd
+# Sidecar file in the output folder remembering what earlier runs produced.
+CACHE_FILENAME = ".autotranscoder_cache.json"
+# Buffer size for the userspace copy fallback.
+COPY_BUFSIZE = 4 * 1024 * 1024
+# Kernel copy errors that mean "not possible here", rather than a real failure.
+_KERNEL_COPY_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.ENOTSUP, errno.EOPNOTSUPP, errno.ENOTSOCK}
+# In-kernel copies to try, in order, as (src_fd, dst_fd, count) -> bytes copied.
+_KERNEL_COPIES = []
+if hasattr(os, 'copy_file_range'):
+    _KERNEL_COPIES.append(os.copy_file_range)
+if hasattr(os, 'sendfile') and sys.platform.startswith('linux'):
+    _KERNEL_COPIES.append(lambda src_fd, dst_fd, count: os.sendfile(dst_fd, src_fd, None, count))
+# ffmpeg environment and command prefix are the same for every job, so build them once.
+_TRANSCODE_ENV = {**os.environ, "PYTHONIOENCODING": "utf-8"}
+_CMD_PREFIX = ["ffmpeg", "-y", "-loglevel", "error"]
+# Most ffmpeg error text kept per job; anything beyond it is drained and dropped.
+STDERR_LIMIT = 1 << 20
+# Seconds an ffmpeg run may take per input file before it is presumed hung and killed.
+FFMPEG_TIMEOUT_PER_FILE = 3600
+# Maps lowercased file extensions to the file types we handle.
+_EXT_MAP = {'flac': 'flac', 'mp3': 'mp3'}
+# Minimum time between progress bar redraws, in seconds (at most 20 per second).
+PROGRESS_INTERVAL = 0.05
+
+# Output from worker threads is queued and written by a single logger thread,
+# so workers never contend for stdout.
+log_q = queue.Queue()
+_last_progress = 0.0
+
+def _drain_log():
+    unflushed = None
+    while True:
+        stream, text = log_q.get()
+        try:
+            # Flush before switching streams so stdout and stderr stay in order
+            # when both go to the same terminal.
+            if unflushed is not None and unflushed is not stream:
+                unflushed.flush()
+            stream.write(text)
+            unflushed = stream
+            if log_q.empty():
+                stream.flush()
+                unflushed = None
+        except Exception:
+            pass
+        finally:
+            log_q.task_done()
+
+threading.Thread(target=_drain_log, daemon=True).start()
+atexit.register(log_q.join)
+
+def log(text="", end="\n", stream=None):
+    log_q.put((stream or sys.stdout, text + end))
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description="Transcode FLAC files to MP3")
     parser.add_argument("input_folder", help="Input folder containing FLAC files")
     parser.add_argument("output_folder", help="Output folder for MP3 files")
     parser.add_argument("--threads", type=int, default=os.cpu_count(), 
-                        help="Number of threads to use (default: number of CPU cores)")
+                        help="Number of ffmpeg processes to run in parallel (default: number of CPU cores)")
     parser.add_argument("--min-size", type=int, default=200, 
                         help="Minimum file size in KB (default: 200KB)")
     parser.add_argument("--delete-small", action="store_true",
                         help="Delete small files that are likely fake")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help=f"Number of FLAC files encoded per ffmpeg process (default: {BATCH_SIZE})")
+    parser.add_argument("--force", action="store_true",
+                        help="Process every file again, even if unchanged since the last run")
     return parser.parse_args()
 
-def is_file_too_small(file_path, min_size_kb):
-    try:
-        file_size_kb = os.path.getsize(file_path) / 1024
-        return file_size_kb < min_size_kb
-    except Exception:
-        return False
-
 def delete_small_file(file_path):
     try:
         os.remove(file_path)
-        print(f"Deleted small file (likely fake): {file_path}")
+        log(f"Deleted small file (likely fake): {file_path}")
         return True
     except Exception as e:
-        print(f"Failed to delete {file_path}: {str(e)}")
+        log(f"Failed to delete {file_path}: {str(e)}")
         return False
 
-def find_audio_files(input_folder, min_size_kb=200, delete_small=False):
+def scan_directory(path, min_size):
+    audio_files = []
+    small_files = []
+    subdirs = []
+    
+    dir_fd = None
+    try:
+        if SCANDIR_FD:
+            dir_fd = os.open(path, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+            entries = os.scandir(dir_fd)
+        else:
+            entries = os.scandir(path)
+    except OSError:
+        if dir_fd is not None:
+            os.close(dir_fd)
+        return audio_files, small_files, subdirs
+    
+    try:
+        with entries:
+            for entry in entries:
+                name = entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(os.path.join(path, name))
+                        continue
+                except OSError:
+                    continue
+                
+                dot = name.rfind('.')
+                file_type = _EXT_MAP.get(name[dot + 1:].lower()) if dot >= 0 else None
+                if file_type is None:
+                    continue
+                
+                full_path = os.path.join(path, name)
+                try:
+                    stat = entry.stat()
+                    size = stat.st_size
+                    mtime_ns = stat.st_mtime_ns
+                    too_small = size < min_size
+                except OSError:
+                    size = 0
+                    mtime_ns = 0
+                    too_small = False
+                
+                if too_small:
+                    small_files.append(full_path)
+                    continue
+                
+                audio_files.append((full_path, name, name[:dot] or name, file_type, size, mtime_ns))
+    finally:
+        if dir_fd is not None:
+            os.close(dir_fd)
+    
+    return audio_files, small_files, subdirs
+
+def find_audio_files(input_folder, min_size_kb=200, delete_small=False, scan_workers=None):
     audio_files = []
     small_files_count = 0
+    min_size = min_size_kb * 1024
     
-    for root, _, files in os.walk(input_folder):
-        for file in files:
-            file_lower = file.lower()
-            full_path = os.path.join(root, file)
-            
-            if file_lower.endswith(('.flac', '.mp3')):
-                if is_file_too_small(full_path, min_size_kb):
+    # Scanning is I/O bound, so overlap readdir/stat latency across many threads.
+    if scan_workers is None:
+        scan_workers = min(32, (os.cpu_count() or 1) * 4)
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=scan_workers) as executor:
+        pending = {executor.submit(scan_directory, input_folder, min_size)}
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                found, small_files, subdirs = future.result()
+                audio_files.extend(found)
+                pending.update(executor.submit(scan_directory, subdir, min_size) for subdir in subdirs)
+                
+                for full_path in small_files:
                     small_files_count += 1
-                    print(f"Found small file (likely fake): {full_path}")
+                    log(f"Found small file (likely fake): {full_path}")
                     if delete_small:
                         delete_small_file(full_path)
-                    continue
-                
-                file_type = 'flac' if file_lower.endswith('.flac') else 'mp3'
-                audio_files.append((full_path, file_type))
     
     if small_files_count > 0:
         action = "Deleted" if delete_small else "Skipped"
-        print(f"{action} {small_files_count} small files (likely fake)")
+        log(f"{action} {small_files_count} small files (likely fake)")
     
     return audio_files
 
-def get_unique_output_path(output_file):
-    if not os.path.exists(output_file):
-        return output_file
+def get_unique_output_path(output_folder, filename, existing, lock):
+    name, ext = os.path.splitext(filename)
     
-    name, ext = os.path.splitext(output_file)
-    index = 1
-    while os.path.exists(f"{name}_{index}{ext}"):
-        index += 1
+    # existing holds every name already present in or claimed for the output
+    # folder, so conflicts resolve in memory without probing the filesystem.
+    # Names are casefolded on every platform, because macOS and FAT/exFAT
+    # volumes are case-insensitive even where os.path.normcase is a no-op.
+    with lock:
+        candidate = filename
+        index = 1
+        while candidate.casefold() in existing:
+            candidate = f"{name}_{index}{ext}"
+            index += 1
+        existing.add(candidate.casefold())
     
-    return f"{name}_{index}{ext}"
+    return os.path.join(output_folder, candidate)
+
+def release_output_path(output_file, existing, lock):
+    with lock:
+        existing.discard(os.path.basename(output_file).casefold())
 
-def copy_file(mp3_file, output_folder):
+def encode_args(codec):
+    return ["-b:a", "320k", "-c:a", codec, "-threads", "1"]
+
+def map_args(index):
+    # Audio, every picture (copied as-is) and tags all come from the same
+    # input, so batched and single-file runs produce identical outputs.
+    return [
+        "-map", f"{index}:a",
+        "-map", f"{index}:v?",
+        "-map_metadata", str(index),
+        "-c:v", "copy",
+    ]
+
+def detect_mp3_encoder():
+    # The fixed-point SHINE encoder is considerably faster than LAME on ARM,
+    # where LAME has no hand-tuned SIMD paths.
+    if not platform.machine().lower().startswith(('arm', 'aarch64')):
+        return "libmp3lame"
+    
     try:
-        mp3_path = Path(mp3_file)
-        output_dir = Path(output_folder)
+        process = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            encoding='utf-8',
+            errors='replace',
+            env=_TRANSCODE_ENV,
+        )
+    except OSError:
+        return "libmp3lame"
+    
+    if any(line.split()[1:2] == ["libshine"] for line in process.stdout.splitlines()):
+        return "libshine"
+    return "libmp3lame"
+
+def detect_threaded_pipeline():
+    # ffmpeg 7 runs every demuxer, decoder and encoder on its own thread, so a
+    # batch keeps one encoder per file busy whatever "-threads 1" says. Builds
+    # without a release number (git snapshots) are treated as threaded too.
+    try:
+        process = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-version"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            encoding='utf-8',
+            errors='replace',
+            env=_TRANSCODE_ENV,
+        )
+    except OSError:
+        return False
+    
+    match = re.match(r"ffmpeg version n?(\d+)\.", process.stdout)
+    return match is None or int(match.group(1)) >= 7
+
+def copy_file_data(src, dst, size):
+    # Let the kernel copy (or reflink) the data where it can. Every method
+    # advances the file offsets, so the next one resumes where the last stopped.
+    count = max(size, COPY_BUFSIZE)
+    for kernel_copy in _KERNEL_COPIES:
+        try:
+            # Some FUSE, network and older cross-filesystem setups report 0
+            # bytes instead of an error; a non-empty file must not end up empty.
+            if kernel_copy(src.fileno(), dst.fileno(), count) == 0 and size > 0:
+                continue
+            while kernel_copy(src.fileno(), dst.fileno(), count) > 0:
+                pass
+            return
+        except OSError as e:
+            if e.errno not in _KERNEL_COPY_UNSUPPORTED:
+                raise
+    
+    shutil.copyfileobj(src, dst, COPY_BUFSIZE)
+
+def copy_file(mp3_file, output_name, size, mtime_ns, output_folder, existing, lock):
+    try:
+        output_file = get_unique_output_path(output_folder, output_name, existing, lock)
         
-        output_file = output_dir / mp3_path.name
-        output_file = get_unique_output_path(str(output_file))
+        with open(mp3_file, 'rb', buffering=0) as src, open(output_file, 'wb', buffering=0) as dst:
+            copy_file_data(src, dst, size)
         
-        shutil.copy2(mp3_file, output_file)
+        # size and mtime come from the scan, so the source is never stat'ed again.
+        os.utime(output_file, ns=(time.time_ns(), mtime_ns))
         
-        print(f"\nCopied MP3 file: {mp3_file} -> {output_file}")
-        return True
+        log(f"\nCopied MP3 file: {mp3_file} -> {output_file}")
+        return output_file
     except Exception as e:
-        print(f"Exception while copying {mp3_file}: {str(e)}")
-        return False
+        log(f"Exception while copying {mp3_file}: {str(e)}")
+        return None
 
-def transcode_file(flac_file, output_folder):
+async def read_stderr(process):
+    chunks = []
+    kept = 0
+    while True:
+        chunk = await process.stderr.read(STDERR_LIMIT)
+        if not chunk:
+            break
+        if kept < STDERR_LIMIT:
+            chunks.append(chunk[:STDERR_LIMIT - kept])
+            kept += len(chunks[-1])
+    await process.wait()
+    return b"".join(chunks)
+
+async def wait_ffmpeg(process, file_count):
+    # A hung ffmpeg (e.g. on a stalled network mount) must not hold its worker
+    # forever; kill it and report the run as failed.
+    timeout = FFMPEG_TIMEOUT_PER_FILE * file_count
     try:
-        flac_path = Path(flac_file)
-        output_dir = Path(output_folder)
-        
-        filename = flac_path.name
-        mp3_filename = flac_path.stem + ".mp3"
-        output_file = output_dir / mp3_filename
-        output_file = get_unique_output_path(str(output_file))
-        
-        my_env = os.environ.copy()
-        my_env["PYTHONIOENCODING"] = "utf-8"
+        if process.stderr is not None:
+            return await asyncio.wait_for(read_stderr(process), timeout)
+        await asyncio.wait_for(process.wait(), timeout)
+        return b""
+    except asyncio.TimeoutError:
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+        await process.wait()
+        return f"ffmpeg timed out after {timeout} seconds".encode()
+
+async def transcode_file(flac_file, output_name, output_folder, encoder_args, existing, lock):
+    try:
+        output_file = get_unique_output_path(output_folder, output_name, existing, lock)
         
-        cmd = [
-            "ffmpeg",
-            "-i", str(flac_path),
-            "-b:a", "320k",
-            "-c:a", "libmp3lame",
-            "-y",
-            "-loglevel", "error",
-            str(output_file)
-        ]
+        cmd = _CMD_PREFIX + ["-i", flac_file] + map_args(0) + encoder_args + [output_file]
         
-        process = subprocess.run(
-            cmd, 
-            stdout=subprocess.PIPE, 
+        process = await asyncio.create_subprocess_exec(
+            *cmd, 
+            stdout=subprocess.DEVNULL, 
             stderr=subprocess.PIPE,
-            encoding='utf-8',
-            errors='replace',
-            env=my_env,
+            env=_TRANSCODE_ENV,
+            limit=STDERR_LIMIT,
         )
+        stderr = await wait_ffmpeg(process, 1)
         
         if process.returncode == 0:
-            print(f"\nSuccessfully transcoded: {flac_file} -> {output_file}")
-            return True
+            log(f"\nSuccessfully transcoded: {flac_file} -> {output_file}")
+            return output_file
         else:
-            print(f"\nError transcoding {flac_file}: {process.stderr}")
-            return False
+            log(f"\nError transcoding {flac_file}: {stderr.decode('utf-8', errors='replace')}")
+            return None
             
     except Exception as e:
-        print(f"Exception while processing {flac_file}: {str(e)}")
-        return False
+        log(f"Exception while processing {flac_file}: {str(e)}")
+        return None
 
-def process_file(file_info, output_folder):
-    file_path, file_type = file_info
+async def transcode_batch(flac_files, output_folder, encoder_args, existing, lock):
+    if len(flac_files) == 1:
+        flac_file, output_name = flac_files[0]
+        return [await transcode_file(flac_file, output_name, output_folder, encoder_args, existing, lock)]
     
-    if file_type == 'mp3':
-        return copy_file(file_path, output_folder)
-    else:
-        return transcode_file(file_path, output_folder)
+    output_files = []
+    try:
+        cmd = list(_CMD_PREFIX)
+        for flac_file, _ in flac_files:
+            cmd += ["-i", flac_file]
+        
+        for index, (_, output_name) in enumerate(flac_files):
+            output_file = get_unique_output_path(output_folder, output_name, existing, lock)
+            output_files.append(output_file)
+            cmd += map_args(index)
+            cmd += encoder_args
+            cmd.append(output_file)
+        
+        # A failed batch is retried file by file, which reports the error, so
+        # nothing here needs ffmpeg's output.
+        process = await asyncio.create_subprocess_exec(
+            *cmd, 
+            stdout=subprocess.DEVNULL, 
+            stderr=subprocess.DEVNULL,
+            env=_TRANSCODE_ENV,
+        )
+        await wait_ffmpeg(process, len(flac_files))
+    except Exception as e:
+        log(f"Exception while processing batch of {len(flac_files)} files: {str(e)}")
+        process = None
+    
+    if process is not None and process.returncode == 0:
+        results = []
+        for (flac_file, _), output_file in zip(flac_files, output_files):
+            if os.path.exists(output_file):
+                log(f"\nSuccessfully transcoded: {flac_file} -> {output_file}")
+                results.append(output_file)
+            else:
+                log(f"\nError transcoding {flac_file}: no output was written")
+                results.append(None)
+        return results
+    
+    # One bad input aborts the whole ffmpeg run, so drop any partial outputs and
+    # retry the files one by one to isolate the failure.
+    for output_file in output_files:
+        try:
+            os.remove(output_file)
+        except OSError:
+            pass
+        release_output_path(output_file, existing, lock)
+    return [await transcode_file(flac_file, output_name, output_folder, encoder_args, existing, lock)
+            for flac_file, output_name in flac_files]
+
+async def run_all(flac_files, mp3_files, output_folder, encoder_args, batch_size, transcode_workers, copy_workers,
+                  existing, lock, cache, signatures):
+    # A fixed set of workers pulls jobs from shared iterators, so only as many
+    # jobs as there are workers are ever in flight. ffmpeg runs as asyncio
+    # subprocesses supervised by this one thread; copies run on a small pool.
+    loop = asyncio.get_running_loop()
+    # Never make fewer batches than workers, or small libraries would leave
+    # cores idle while a couple of ffmpeg processes do all the work.
+    batch_size = max(1, min(batch_size, len(flac_files) // transcode_workers))
+    batches = (flac_files[start:start + batch_size] for start in range(0, len(flac_files), batch_size))
+    mp3_iter = iter(mp3_files)
+    total_files = len(flac_files) + len(mp3_files)
+    completed = 0
+    failed = 0
+    
+    def record(results):
+        nonlocal completed, failed
+        for (file_path, *_), output_file in results:
+            if output_file is not None:
+                completed += 1
+                cache[os.path.abspath(file_path)] = signatures[file_path] + [os.path.basename(output_file)]
+            else:
+                failed += 1
+            display_progress(completed, failed, total_files)
+    
+    async def transcode_worker():
+        for batch in batches:
+            record(zip(batch, await transcode_batch(batch, output_folder, encoder_args, existing, lock)))
+    
+    async def copy_worker(copy_executor):
+        for file_info in mp3_iter:
+            output_file = await loop.run_in_executor(copy_executor, copy_file, *file_info, output_folder, existing, lock)
+            record([(file_info, output_file)])
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=copy_workers) as copy_executor:
+        await asyncio.gather(
+            *(transcode_worker() for _ in range(transcode_workers)),
+            *(copy_worker(copy_executor) for _ in range(copy_workers)),
+        )
+    
+    return completed, failed
+
+def load_cache(cache_path):
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    
+    # A damaged or hand-edited entry is just a cache miss; keep only entries
+    # shaped like [mtime_ns, size, output_name].
+    if not isinstance(cache, dict):
+        return {}
+    return {
+        file_path: entry for file_path, entry in cache.items()
+        if isinstance(entry, list) and len(entry) == 3
+        and isinstance(entry[0], int) and isinstance(entry[1], int) and isinstance(entry[2], str)
+    }
+
+def save_cache(cache_path, cache):
+    try:
+        temp_path = cache_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        log(f"Failed to save cache {cache_path}: {str(e)}")
 
 def display_progress(completed, failed, total):
+    global _last_progress
+    now = time.monotonic()
+    if completed + failed < total and now - _last_progress < PROGRESS_INTERVAL:
+        return
+    _last_progress = now
+    
     width = 50
     percentage = (completed + failed) / total if total > 0 else 0
     filled_width = int(width * percentage)
     bar = '█' * filled_width + '-' * (width - filled_width)
-    sys.stdout.write(f"\rProgress: [{bar}] {percentage*100:.1f}% ({completed + failed}/{total}, {completed} succeeded, {failed} failed)")
-    sys.stdout.flush()
+    log(f"\rProgress: [{bar}] {percentage*100:.1f}% ({completed + failed}/{total}, {completed} succeeded, {failed} failed)", end="", stream=sys.stderr)
 
 def main():
     args = parse_arguments()
     
     os.makedirs(args.output_folder, exist_ok=True)
     
-    print("Scanning for FLAC and MP3 files...")
+    log("Scanning for FLAC and MP3 files...")
     audio_files = find_audio_files(args.input_folder, args.min_size, args.delete_small)
     total_files = len(audio_files)
     
     if total_files == 0:
-        print("No valid audio files found in the input folder.")
+        log("No valid audio files found in the input folder.")
         sys.exit(0)
     
-    flac_count = sum(1 for _, file_type in audio_files if file_type == 'flac')
-    mp3_count = sum(1 for _, file_type in audio_files if file_type == 'mp3')
-    print(f"Found {total_files} valid audio files ({flac_count} FLAC, {mp3_count} MP3).")
+    # Encoding time grows with file size, so start the largest files first to
+    # keep workers from idling behind one long job at the end of the run.
+    audio_files.sort(key=lambda file_info: -file_info[4])
     
-    print(f"Processing with {args.threads} threads...")
+    existing = {name.casefold() for name in os.listdir(args.output_folder)}
+    lock = threading.Lock()
     
-    completed = 0
-    failed = 0
+    # Files whose size and mtime match the previous run and whose output is
+    # still present are skipped, so incremental runs cost little beyond the scan.
+    # --force processes them anyway, overwriting their previous outputs.
+    cache_path = os.path.join(args.output_folder, CACHE_FILENAME)
+    cache = load_cache(cache_path)
+    atexit.register(save_cache, cache_path, cache)
     
-    with concurrent.futures.ThreadPoolExecutor(max_workers=args.threads) as executor:
-        futures = {executor.submit(process_file, file_info, args.output_folder): file_info 
-                  for file_info in audio_files}
-        
-        for future in concurrent.futures.as_completed(futures):
-            if future.result():
-                completed += 1
-            else:
-                failed += 1
-            display_progress(completed, failed, total_files)
+    flac_files = []
+    mp3_files = []
+    signatures = {}
+    flac_count = 0
+    skipped = 0
+    for file_path, name, stem, file_type, size, mtime_ns in audio_files:
+        if file_type == 'flac':
+            flac_count += 1
+        signature = [mtime_ns, size]
+        cached = cache.get(os.path.abspath(file_path))
+        if cached is not None:
+            if not args.force and cached[:2] == signature and cached[2].casefold() in existing:
+                skipped += 1
+                continue
+            # The source changed (or --force is set), so let its new output
+            # replace the previous one.
+            existing.discard(cached[2].casefold())
+        signatures[file_path] = signature
+        if file_type == 'flac':
+            flac_files.append((file_path, stem + ".mp3"))
+        else:
+            mp3_files.append((file_path, name, size, mtime_ns))
+    mp3_count = total_files - flac_count
+    log(f"Found {total_files} valid audio files ({flac_count} FLAC, {mp3_count} MP3).")
+    if skipped > 0:
+        log(f"Skipping {skipped} files unchanged since the last run.")
+    
+    codec = detect_mp3_encoder() if flac_files else "libmp3lame"
+    if codec != "libmp3lame":
+        log(f"Using {codec} encoder.")
+    
+    # Each encoder is single-threaded, so aim for about --threads encoders at
+    # once. Older ffmpeg drives all of a batch's encoders from one main loop, so
+    # a process is roughly one busy core and one process per thread fits. ffmpeg
+    # 7+ runs them in parallel, so a process keeps up to a whole batch of cores
+    # busy: batches are capped at --threads and the process count is divided by
+    # the batch size. Copies get their own small pool.
+    batch_size = max(1, args.batch_size)
+    if flac_files and detect_threaded_pipeline():
+        batch_size = max(1, min(batch_size, args.threads))
+        transcode_workers = max(1, min(args.threads // batch_size, len(flac_files)))
+    else:
+        transcode_workers = max(1, min(args.threads, len(flac_files)))
+    copy_workers = max(1, min(COPY_WORKERS, len(mp3_files)))
+    log(f"Processing with {transcode_workers} concurrent ffmpeg jobs and {copy_workers} copy threads...")
+    
+    completed, failed = asyncio.run(run_all(
+        flac_files, mp3_files, args.output_folder, encode_args(codec), batch_size,
+        transcode_workers, copy_workers, existing, lock, cache, signatures,
+    ))
+    completed += skipped
     
-    print(f"\nProcessing complete. {completed} files succeeded, {failed} files failed.")
+    log(f"\nProcessing complete. {completed} files succeeded, {failed} files failed.")
 
 if __name__ == "__main__":
     if sys.platform == "win32":